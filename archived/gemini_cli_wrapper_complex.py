@@ -1,19 +1,21 @@
 #!/usr/bin/env python3
 """
-Pexpect-based Gemini CLI Wrapper for MCP Server
+PTY-based Gemini CLI Wrapper for MCP Server
 
-This module provides a proper interface to the actual gemini-cli binary using pexpect,
-the standard library for controlling interactive applications.
+This module provides a proper interface to the actual gemini-cli binary, running it
+on a pseudo-terminal driven directly by asyncio.
 """
 
 import asyncio
+import functools
 import logging
+import os
+import pty
 import re
+import shutil
 import subprocess
 import sys
 
-import pexpect
-
 # Configure logging to stderr for MCP servers
 logging.basicConfig(
     level=logging.INFO,
@@ -22,6 +24,47 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Response reading parameters
+_READ_CHUNK_SIZE = 65536  # Max bytes pulled from the pty per read
+_PROMPT_TAIL_BYTES = 4096  # Only the end of the output can hold a prompt
+_PROMPT_SCAN_CHARS = 512  # Portion of the tail searched for prompt patterns
+_MAX_RESPONSE_BYTES = 2 << 20  # Cap on buffered output per response
+
+# ANSI escape sequences (colors, cursor movement), matched on raw pty bytes
+_ANSI_RE = re.compile(rb'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+
+# Common patterns for confirmation/input prompts, unioned into one scan
+_PROMPT_RE = re.compile(
+    r'\(y/n\)|\[y/n\]|\(yes/no\)|\[yes/no\]'
+    r'|confirm|proceed|continue|allow'
+    r'|select an option|enter your choice'
+    r'|\[\d+\]'  # e.g., [1], [2] for numbered options
+    r'|\(default: [^)]*\)'  # e.g., (default: yes)
+    r'|press enter to continue'
+    r'|type your response'
+    r'|authentication required'  # Specific to gemini-cli auth
+    r'|allow execution',  # Specific to gemini-cli tool execution
+    re.IGNORECASE
+)
+
+
+@functools.lru_cache(maxsize=8)
+def _probe_gemini(command: str, mtime: float) -> str:
+    """Run `<command> --version` once per binary and return the version string"""
+    result = subprocess.run(
+        [command, "--version"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        timeout=5
+    )
+    if result.returncode != 0:
+        stderr_text = result.stderr.decode('utf-8', errors='replace')
+        raise Exception(f"Gemini CLI not working (exit code {result.returncode}): {stderr_text}")
+
+    version_info = result.stdout.decode('utf-8', errors='replace').strip()
+    logger.info(f"Gemini CLI available: {version_info}")
+    return version_info
+
 
 # Custom exception for interactive prompts
 class InteractivePromptDetected(Exception):
@@ -31,7 +74,7 @@ class InteractivePromptDetected(Exception):
 
 
 class GeminiCLIWrapper:
-    """Pexpect-based wrapper for the actual gemini CLI binary with persistent session"""
+    """Wrapper for the actual gemini CLI binary with persistent session"""
 
     def __init__(self, gemini_command: str = "gemini"):
         """
@@ -43,21 +86,13 @@ class GeminiCLIWrapper:
 
     def _verify_gemini_available(self) -> None:
         """Verify that gemini-cli is available and working"""
-        try:
-            result = subprocess.run(
-                [self.gemini_command, "--version"],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if result.returncode != 0:
-                raise Exception(f"Gemini CLI not working (exit code {result.returncode}): {result.stderr}")
-
-            version_info = result.stdout.strip()
-            logger.info(f"Gemini CLI available: {version_info}")
-
-        except FileNotFoundError:
+        path = shutil.which(self.gemini_command)
+        if path is None:
             raise Exception(f"Gemini CLI command '{self.gemini_command}' not found in PATH")
+
+        try:
+            # Keyed on the binary's mtime so an upgraded CLI is probed again
+            self._version = _probe_gemini(path, os.path.getmtime(path))
         except subprocess.TimeoutExpired:
             raise Exception("Gemini CLI version check timed out")
         except Exception as e:
@@ -71,7 +106,7 @@ class GeminiCLIWrapper:
         checkpointing: bool = False
     ) -> 'GeminiInteractiveSession':
         """
-        Start an interactive Gemini CLI session using pexpect.
+        Start an interactive Gemini CLI session on a pty.
 
         Args:
             working_directory: Directory to run gemini from
@@ -92,7 +127,7 @@ class GeminiCLIWrapper:
             cmd_parts.append("-c")
 
         try:
-            logger.debug(f"Starting pexpect-based interactive session: {' '.join(cmd_parts)}")
+            logger.debug("Starting pty-based interactive session: %s", cmd_parts)
 
             session = GeminiInteractiveSession(cmd_parts, working_directory)
             await session.start()
@@ -105,40 +140,98 @@ class GeminiCLIWrapper:
 
 
 class GeminiInteractiveSession:
-    """Manages an interactive Gemini CLI session using pexpect"""
+    """Manages an interactive Gemini CLI session over a pseudo-terminal"""
 
     def __init__(self, cmd_parts: list[str], working_directory: str):
         self.cmd_parts = cmd_parts
         self.working_directory = working_directory
-        self.child: pexpect.spawn | None = None
+        self.process: asyncio.subprocess.Process | None = None
+        self.master_fd: int | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # Output chunks pushed by the pty reader; b"" signals EOF
+        self._output: asyncio.Queue[bytes] = asyncio.Queue()
+        self._log_output = False
         self._ready = False
+        self._eof = False  # Set once the pty reports the CLI has gone
 
     async def start(self) -> None:
-        """Start the pexpect session"""
+        """Start the gemini process on a pty and wait for its first prompt"""
         try:
-            self.child = await asyncio.get_event_loop().run_in_executor(
-                None, self._start_pexpect_session
-            )
+            # gemini's interactive UI needs a real terminal, so give it the
+            # slave end of a pty and read the master end from the event loop.
+            master_fd, slave_fd = pty.openpty()
+            try:
+                self.process = await asyncio.create_subprocess_exec(
+                    *self.cmd_parts,
+                    cwd=self.working_directory,
+                    stdin=slave_fd,
+                    stdout=slave_fd,
+                    stderr=slave_fd,
+                    start_new_session=True
+                )
+            except Exception:
+                os.close(master_fd)
+                raise
+            finally:
+                os.close(slave_fd)
+
+            self.master_fd = master_fd
+            os.set_blocking(master_fd, False)
+            self._log_output = logger.isEnabledFor(logging.DEBUG)
+            self._loop = asyncio.get_running_loop()
+            self._loop.add_reader(master_fd, self._on_pty_readable)
+
             await self._wait_for_ready()
+            if self._eof:
+                raise Exception("Gemini CLI exited during startup")
             self._ready = True
-            logger.info("Gemini pexpect session ready")
+            logger.info("Gemini pty session ready")
 
         except Exception as e:
-            raise Exception(f"Failed to start pexpect session: {str(e)}")
-
-    def _start_pexpect_session(self) -> pexpect.spawn:
-        """Start the pexpect session (blocking operation)"""
-        command = ' '.join(self.cmd_parts)
-        # Set a very long timeout for the spawn itself to avoid premature termination
-        child = pexpect.spawn(command, cwd=self.working_directory, timeout=None)
-        if logger.isEnabledFor(logging.DEBUG):
-            child.logfile_read = sys.stderr.buffer
-        return child
+            raise Exception(f"Failed to start pty session: {str(e)}")
+
+    def _on_pty_readable(self) -> None:
+        """Event loop callback: drain all available pty output into the queue"""
+        if self.master_fd is None:
+            return
+
+        # The pty hands out at most a few KB per read, so keep reading until
+        # it would block and queue the whole burst as one chunk.
+        chunks: list[bytes] = []
+        eof = False
+        while True:
+            try:
+                data = os.read(self.master_fd, _READ_CHUNK_SIZE)
+            except BlockingIOError:
+                break
+            except OSError:
+                # Linux reports EIO on the master once the child side has closed
+                data = b""
+            if not data:
+                eof = True
+                break
+            chunks.append(data)
+
+        if chunks:
+            burst = b"".join(chunks)
+            if self._log_output:
+                sys.stderr.buffer.write(burst)
+            self._output.put_nowait(burst)
+        if eof:
+            self._eof = True
+            self._ready = False
+            self._stop_reading()
+            self._output.put_nowait(b"")
+
+    def _stop_reading(self) -> None:
+        """Detach the pty from the event loop"""
+        if self._loop and self.master_fd is not None:
+            self._loop.remove_reader(self.master_fd)
 
     async def _wait_for_ready(self) -> None:
         """Wait for Gemini to be ready for input by clearing initial output."""
-        if not self.child:
-            raise Exception("Pexpect child process is not started")
+        if self.master_fd is None:
+            raise Exception("Gemini process is not started")
         try:
             # Clear any startup text by reading until the first prompt is likely shown
             await self._read_response()
@@ -149,17 +242,17 @@ class GeminiInteractiveSession:
 
     async def send_prompt(self, prompt: str) -> str:
         """Send a prompt to Gemini and get the response, waiting indefinitely."""
-        if not self._ready or not self.child:
+        if self._eof:
+            raise Exception("Gemini CLI process has exited")
+        if not self._ready or self.master_fd is None:
             raise Exception("Session not ready")
 
         try:
-            logger.debug(f"Sending prompt: {prompt[:100]}...")
-            await asyncio.get_event_loop().run_in_executor(
-                None, self._send_prompt_blocking, prompt
-            )
+            logger.debug("Sending prompt: %.100s...", prompt)
+            await self._sendline(prompt)
             raw_response = await self._read_response()
             cleaned_response = self._clean_response(raw_response, prompt)
-            logger.debug(f"Received cleaned response length: {len(cleaned_response)}")
+            logger.debug("Received cleaned response length: %d", len(cleaned_response))
             return cleaned_response
 
         except InteractivePromptDetected:
@@ -169,103 +262,113 @@ class GeminiInteractiveSession:
             await self.close() # Close session on error
             raise
 
-    def _send_prompt_blocking(self, prompt: str) -> None:
-        """Send prompt (blocking operation)"""
-        if self.child:
-            self.child.sendline(prompt)
+    async def _sendline(self, text: str) -> None:
+        """Write a line of input to the pty, waiting for room when it is full"""
+        if self.master_fd is None:
+            raise Exception("Gemini process is not started")
+        data = memoryview(f"{text}\n".encode())
+        while data:
+            try:
+                written = os.write(self.master_fd, data)
+            except BlockingIOError:
+                # The master fd is non-blocking; a long prompt can fill the pty
+                await self._wait_writable()
+                continue
+            data = data[written:]
+
+    async def _wait_writable(self) -> None:
+        """Wait until the pty master can accept more input"""
+        writable = self._loop.create_future()
 
-    async def _read_response(self) -> str:
+        def _on_writable() -> None:
+            if not writable.done():
+                writable.set_result(None)
+
+        self._loop.add_writer(self.master_fd, _on_writable)
+        try:
+            await writable
+        finally:
+            self._loop.remove_writer(self.master_fd)
+
+    async def _read_response(self) -> bytes:
         """
         Reads the complete response from the Gemini CLI by waiting for output to cease,
         or raises InteractivePromptDetected if an interactive prompt is found.
         """
-        if not self.child:
-            raise Exception("Child process not available")
+        if self.master_fd is None:
+            raise Exception("Gemini process not available")
 
-        response_buffer = ""
+        buffer = bytearray()
+        truncated = False
         logger.debug("Reading response until output ceases or prompt detected...")
 
         read_timeout = 3.0  # Consider the response complete after 3s of silence.
-        while self.child.isalive():
+        while True:
+            if self._eof and self._output.empty():
+                # The CLI is gone and everything it wrote has been read
+                break
             try:
-                await asyncio.get_event_loop().run_in_executor(
-                    None, self.child.expect, r'.+', read_timeout
-                )
-                if isinstance(self.child.after, bytes):
-                    new_data = self.child.after.decode('utf-8', errors='ignore')
-                    response_buffer += new_data
-                else:
-                    # This case should ideally not be reached if expect() is successful
-                    # but handles type checker concerns.
-                    new_data = ""
-
-                # Check for interactive prompts after receiving new data
-                if self._is_interactive_prompt(response_buffer):
-                    raise InteractivePromptDetected(prompt_text=response_buffer)
-
-            except pexpect.TIMEOUT:
-                if response_buffer:
-                    logger.info(f"Response complete (detected by {read_timeout}s of inactivity).")
+                data = await asyncio.wait_for(self._output.get(), timeout=read_timeout)
+            except asyncio.TimeoutError:
+                if buffer:
+                    logger.info("Response complete (detected by %ss of inactivity).", read_timeout)
                     break
                 continue
-            except pexpect.EOF:
+
+            if not data:
                 logger.warning("EOF reached. Gemini CLI process terminated.")
                 break
-            except InteractivePromptDetected:
-                raise # Re-raise the custom exception
-            except Exception as e:
-                logger.error(f"An unexpected error occurred while reading response: {e}")
-                break
+            buffer += data
+            if len(buffer) > _MAX_RESPONSE_BYTES:
+                # Keep only the most recent output of a runaway response
+                del buffer[:len(buffer) - _MAX_RESPONSE_BYTES]
+                truncated = True
+
+            # Interactive prompts always appear at the end of the output
+            tail = buffer[-_PROMPT_TAIL_BYTES:].decode('utf-8', errors='ignore')
+            if self._is_interactive_prompt(tail):
+                raise InteractivePromptDetected(
+                    prompt_text=buffer.decode('utf-8', errors='ignore')
+                )
 
-        return response_buffer
+        if truncated:
+            logger.warning(f"Response exceeded {_MAX_RESPONSE_BYTES} bytes; earlier output was dropped")
+            return b"[...response truncated...]\n" + buffer
+        return bytes(buffer)
 
     def _is_interactive_prompt(self, text: str) -> bool:
         """
-        Checks if the given text (or its end) contains patterns indicative of an interactive prompt.
+        Checks if the end of the given text contains patterns indicative of an interactive prompt.
         This is a heuristic and might need refinement based on actual gemini-cli prompts.
         """
-        text_lower = text.lower().strip()
-        # Common patterns for confirmation/input prompts
-        prompt_patterns = [
-            r'\(y/n\)', r'\[y/n\]', r'\(yes/no\)', r'\[yes/no\]',
-            r'confirm', r'proceed', r'continue', r'allow',
-            r'select an option', r'enter your choice',
-            r'\[\\d+\]', # e.g., [1], [2] for numbered options
-            r'\(default: .*\)', # e.g., (default: yes)
-            r'press enter to continue',
-            r'type your response',
-            r'authentication required', # Specific to gemini-cli auth
-            r'allow execution', # Specific to gemini-cli tool execution
-        ]
-
         # Check the last few lines for prompts
-        last_lines = "\n".join(text_lower.splitlines()[-5:])
-        for pattern in prompt_patterns:
-            if re.search(pattern, last_lines):
-                logger.debug(f"Detected interactive prompt pattern: {pattern}")
-                return True
+        last_lines = "\n".join(text[-_PROMPT_SCAN_CHARS:].splitlines()[-5:])
+        match = _PROMPT_RE.search(last_lines)
+        if match:
+            logger.debug("Detected interactive prompt pattern: %s", match.group(0))
+            return True
         return False
 
-    def _clean_response(self, text: str, prompt: str) -> str:
-        """Clean up the pexpect output to return only the AI's response."""
-        # 1. Remove the prompt that was sent, as it's often echoed.
-        # We'll remove the first line if it closely matches the prompt.
-        lines = text.split('\n')
-        if lines and lines[0].strip() == prompt.strip():
-            cleaned_text = '\n'.join(lines[1:])
-        else:
-            cleaned_text = text
+    def _clean_response(self, data: bytes, prompt: str) -> str:
+        """Clean up the pty output to return only the AI's response."""
+        # 1. Remove ANSI escape codes before decoding (plain output has none).
+        if b'\x1b' in data:
+            data = _ANSI_RE.sub(b'', data)
+        text = data.decode('utf-8', errors='ignore')
 
-        # 2. Remove ANSI escape codes.
-        ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[0-?]*[ -/]*[@-~])')
-        cleaned_text = ansi_escape.sub('', cleaned_text)
+        # 2. Remove the prompt that was sent, as it's often echoed.
+        # We'll remove the first line if it closely matches the prompt.
+        first_line_end = text.find('\n')
+        first_line = text if first_line_end == -1 else text[:first_line_end]
+        if first_line.strip() == prompt.strip():
+            text = '' if first_line_end == -1 else text[first_line_end + 1:]
 
         # 3. Final whitespace cleanup.
-        return cleaned_text.strip()
+        return text.strip()
 
     def is_running(self) -> bool:
         """Check if the session is still running"""
-        return self._ready and self.child is not None and self.child.isalive()
+        return self._ready and self.process is not None and self.process.returncode is None
 
     async def save_memory(self, text: str) -> str:
         return await self.send_prompt(f"Please remember this: {text}")
@@ -285,15 +388,26 @@ class GeminiInteractiveSession:
     async def close(self) -> None:
         """Close the session"""
         self._ready = False
-        if self.child and self.child.isalive():
+        if self.process and self.process.returncode is None:
             try:
-                self.child.sendline("/quit")
-                await asyncio.sleep(0.5)
-                self.child.terminate()
-                await asyncio.sleep(0.5)
-                if self.child.isalive():
-                    self.child.kill(9)
+                # Wait on the actual exit rather than sleeping a fixed amount
+                try:
+                    await asyncio.wait_for(self._sendline("/quit"), timeout=0.5)
+                    await asyncio.wait_for(self.process.wait(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    self.process.terminate()
+                    try:
+                        await asyncio.wait_for(self.process.wait(), timeout=0.5)
+                    except asyncio.TimeoutError:
+                        self.process.kill()
+                        await self.process.wait()
+            except ProcessLookupError:
+                pass  # Exited between the checks above
             except Exception as e:
                 logger.warning(f"Error closing session: {e}")
-            finally:
-                self.child = None
+
+        self._stop_reading()
+        if self.master_fd is not None:
+            os.close(self.master_fd)
+            self.master_fd = None
+        self.process = None
@@ -8,38 +8,45 @@ import sys
 import time
 import re
 
-# ANSI escape code removal regex
-ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+# ANSI escape code removal regex, applied to raw bytes before decoding
+ANSI_BYTES = re.compile(rb'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
 
-def clean_ansi(text):
-    """Remove ANSI escape codes from text"""
-    return ansi_escape.sub('', text)
+# Patterns handed to child.expect, compiled once (bytes, to match the spawn)
+STARTUP_PATTERNS = [
+    re.compile(rb'Waiting for auth'),
+    re.compile(rb'Login with Google'),
+    re.compile(rb'Use an API key'),
+    re.compile(rb'> '),  # Normal prompt
+    pexpect.TIMEOUT,
+    pexpect.EOF
+]
+RESPONSE_PATTERNS = [re.compile(rb'> '), pexpect.TIMEOUT]
+
+def clean_ansi(data: bytes) -> str:
+    """Remove ANSI escape codes from raw output and decode it"""
+    if b'\x1b' in data:
+        data = ANSI_BYTES.sub(b'', data)
+    return data.decode('utf-8', 'replace')
 
 print("Starting Gemini CLI debug test...")
 
-# Start gemini with --yolo flag
+# Start gemini with --yolo flag (bytes mode, decoded in clean_ansi)
+# The patterns above are short and sit at the end of the output, so only the
+# tail of the buffer needs searching on each read
 child = pexpect.spawn('gemini --yolo', 
                      timeout=30,
                      dimensions=(24, 80),
-                     encoding='utf-8',
-                     codec_errors='replace')
+                     searchwindowsize=256)
 
 # Enable logging to see raw output
-child.logfile_read = sys.stdout
+child.logfile_read = sys.stdout.buffer
 
 print("\n=== Waiting for initial prompt ===")
 
 # Try to read initial output
 try:
     # Wait for something - let's see what we get
-    index = child.expect([
-        'Waiting for auth',
-        'Login with Google',
-        'Use an API key',
-        '> ',  # Normal prompt
-        pexpect.TIMEOUT,
-        pexpect.EOF
-    ], timeout=10)
+    index = child.expect(STARTUP_PATTERNS, timeout=10)
     
     print(f"\n=== Matched pattern {index} ===")
     print(f"Before: {repr(child.before)}")
@@ -65,7 +72,7 @@ child.sendline("What is 2+2?")
 
 # Wait for response
 try:
-    child.expect(['> ', pexpect.TIMEOUT], timeout=5)
+    child.expect(RESPONSE_PATTERNS, timeout=5)
     print(f"\n=== Response ===")
     print(clean_ansi(child.before))
 except:
@@ -7,10 +7,15 @@ Uses the exact same approach that works in production VibeKit environments.
 """
 
 import asyncio
+import codecs
 import json
 import logging
 import os
+import shutil
+import signal
 import sys
+import time
+from collections.abc import Awaitable, Callable
 from typing import Any
 
 import mcp.server.stdio
@@ -27,6 +32,273 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# VibeKit's mode instructions, prepended to the user's prompt
+_ASK_PREFIX = (
+    "Research the repository and answer the user's questions. "
+    "Do NOT make any changes to any files in the repository."
+    "\n\nUser: "
+)
+_CODE_PREFIX = (
+    "Do the necessary changes to the codebase based on the users input.\n"
+    "Don't ask any follow up questions."
+    "\n\nUser: "
+)
+
+_PIPE_CHUNK_SIZE = 65536  # Bytes read from gemini's stdout/stderr per await
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read a positive integer setting from the environment, ignoring bad values"""
+    try:
+        return max(1, int(os.environ.get(name, default)))
+    except ValueError:
+        logger.warning("Ignoring %s: not an integer", name)
+        return default
+
+
+# gemini processes allowed to run at once; later calls queue
+_MAX_CONCURRENT_CALLS = _env_int("GEMINI_MCP_MAX_CONCURRENT", 4)
+
+# Successful `gemini --version` probes are remembered across server starts
+_VERIFY_CACHE_FILE = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "gemini-mcp",
+    "verified"
+)
+_VERIFY_CACHE_TTL = 24 * 60 * 60  # Seconds before the CLI is probed again
+
+
+# Tool definitions advertised to MCP clients; static, so built once at import
+_TOOLS: list[types.Tool] = [
+    types.Tool(
+        name="gemini_ask",
+        description="Ask Gemini a question (uses VibeKit's proven pattern)",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "prompt": {
+                    "type": "string",
+                    "description": "Question or prompt for Gemini"
+                },
+                "model": {
+                    "type": "string",
+                    "description": "Gemini model to use",
+                    "default": "gemini-2.5-flash"
+                },
+                "working_dir": {
+                    "type": "string",
+                    "description": "Working directory (for file context)",
+                    "default": "."
+                },
+                "files": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Files to include using @ syntax",
+                    "default": []
+                },
+                "timeout": {
+                    "type": "integer",
+                    "description": "Timeout in seconds",
+                    "default": 60
+                }
+            },
+            "required": ["prompt"]
+        }
+    ),
+    types.Tool(
+        name="gemini_code",
+        description="Generate code changes using Gemini (VibeKit code mode)",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "prompt": {
+                    "type": "string",
+                    "description": "Code generation request"
+                },
+                "model": {
+                    "type": "string",
+                    "description": "Gemini model to use",
+                    "default": "gemini-2.5-pro"
+                },
+                "working_dir": {
+                    "type": "string",
+                    "description": "Working directory",
+                    "default": "."
+                },
+                "timeout": {
+                    "type": "integer",
+                    "description": "Timeout in seconds",
+                    "default": 120
+                }
+            },
+            "required": ["prompt"]
+        }
+    ),
+    types.Tool(
+        name="gemini_with_files",
+        description="Ask Gemini with specific files (uses @ syntax)",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "prompt": {
+                    "type": "string",
+                    "description": "The question or prompt"
+                },
+                "file_paths": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "List of file paths to include"
+                },
+                "model": {
+                    "type": "string",
+                    "description": "Gemini model to use",
+                    "default": "gemini-2.5-flash"
+                },
+                "working_dir": {
+                    "type": "string",
+                    "description": "Working directory",
+                    "default": "."
+                },
+                "timeout": {
+                    "type": "integer",
+                    "description": "Timeout in seconds",
+                    "default": 90
+                }
+            },
+            "required": ["prompt", "file_paths"]
+        }
+    ),
+    types.Tool(
+        name="gemini_batch",
+        description="Run several Gemini tool calls concurrently in one request",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "calls": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "name": {
+                                "type": "string",
+                                "enum": [
+                                    "gemini_ask", "gemini_code", "gemini_with_files"
+                                ],
+                                "description": "Tool to call"
+                            },
+                            "arguments": {
+                                "type": "object",
+                                "description": "Arguments for that tool"
+                            }
+                        },
+                        "required": ["name", "arguments"]
+                    },
+                    "description": "Tool calls to run"
+                },
+                "max_concurrent": {
+                    "type": "integer",
+                    "description": "Calls from this batch allowed to run at once",
+                    "default": _MAX_CONCURRENT_CALLS
+                },
+                "stop_on_error": {
+                    "type": "boolean",
+                    "description": "Cancel the remaining calls when one fails",
+                    "default": False
+                }
+            },
+            "required": ["calls"]
+        }
+    )
+]
+
+# Required arguments per tool, taken from the schemas above
+_REQUIRED_ARGS: dict[str, tuple[str, ...]] = {
+    tool.name: tuple(tool.inputSchema.get("required", ())) for tool in _TOOLS
+}
+
+
+def _check_required(name: str, arguments: dict[str, Any]) -> None:
+    """Raise if arguments lacks any argument the tool's schema requires"""
+    missing = [arg for arg in _REQUIRED_ARGS.get(name, ()) if arg not in arguments]
+    if missing:
+        raise Exception(
+            f"Missing required argument(s) for {name}: {', '.join(missing)}"
+        )
+
+
+async def _drain(stream: asyncio.StreamReader) -> str:
+    """Read a subprocess pipe to EOF, returning its decoded, whitespace-trimmed text"""
+    # The incremental decoder holds back characters split across chunks
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    parts: list[str] = []
+
+    def add(text: str) -> None:
+        # Leading whitespace is dropped until the first visible character
+        if not parts:
+            text = text.lstrip()
+        if text:
+            parts.append(text)
+
+    while chunk := await stream.read(_PIPE_CHUNK_SIZE):
+        add(decoder.decode(chunk))
+    add(decoder.decode(b"", final=True))
+
+    # Trailing whitespace only ever needs trimming in the last few parts
+    while parts and not parts[-1].rstrip():
+        parts.pop()
+    if parts:
+        parts[-1] = parts[-1].rstrip()
+    return "".join(parts)
+
+
+async def _communicate(process: asyncio.subprocess.Process) -> tuple[str, str, int]:
+    """Drain stdout and stderr concurrently while waiting for the process to exit"""
+    assert process.stdout is not None and process.stderr is not None
+    # Awaited from a task, so a cancelled gather is collected rather than logged
+    stdout_text, stderr_text, returncode = await asyncio.gather(
+        _drain(process.stdout),
+        _drain(process.stderr),
+        process.wait()
+    )
+    return stdout_text, stderr_text, returncode
+
+
+def _read_verify_cache(key: str) -> str | None:
+    """Return the cached gemini version for key, or None if missing or stale"""
+    try:
+        with open(_VERIFY_CACHE_FILE, encoding="utf-8") as f:
+            cache = json.load(f)
+        age = time.time() - cache["verified_at"]
+        if cache["key"] != key or age > _VERIFY_CACHE_TTL:
+            return None
+        version = cache["version"]
+        # A corrupt or hand-edited file can hold anything
+        return version if isinstance(version, str) else None
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_verify_cache(key: str, version: str) -> None:
+    """Record a successful probe, replacing the cache file atomically"""
+    tmp_path = f"{_VERIFY_CACHE_FILE}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(_VERIFY_CACHE_FILE), exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "version": version, "verified_at": time.time()}, f)
+        os.replace(tmp_path, _VERIFY_CACHE_FILE)
+    except OSError as e:
+        logger.debug(f"Could not write verification cache: {e}")
+
+
+class _SharedRun:
+    """A gemini run joined by identical concurrent calls, with a count of its callers"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task[str]) -> None:
+        self.task = task
+        self.waiters = 0
+
 
 class FixedGeminiMCPServer:
     """Fixed MCP Server using VibeKit's proven gemini-cli integration pattern"""
@@ -34,133 +306,111 @@ class FixedGeminiMCPServer:
     def __init__(self) -> None:
         self.server = Server("fixed-gemini-mcp-server")
         self._verified = False  # Track if gemini-cli has been verified
+        self._verify_lock = asyncio.Lock()  # Serializes the first-use probe
+        self._warmup: asyncio.Task[None] | None = None  # Startup probe, see run()
+        self._base_env = self._build_exec_env()
+        self._call_sem = asyncio.Semaphore(_MAX_CONCURRENT_CALLS)
+        # gemini runs in progress
+        self._processes: set[asyncio.subprocess.Process] = set()
+        # Ask-mode runs still going, keyed on everything that shapes their outcome
+        self._inflight: dict[tuple[str, str, str, int], _SharedRun] = {}
+        # Tool name -> implementation, looked up once per call
+        self._dispatch: dict[str, Callable[[dict[str, Any]], Awaitable[str]]] = {
+            "gemini_ask": self._ask_gemini,
+            "gemini_code": self._code_generation,
+            "gemini_with_files": self._ask_with_files,
+            "gemini_batch": self._run_batch,
+        }
         self._setup_handlers()
 
+    @staticmethod
+    def _build_exec_env() -> dict[str, str]:
+        """Build the environment gemini runs with, like VibeKit (snapshot at startup)"""
+        exec_env = {
+            **os.environ,
+            'NODE_NO_WARNINGS': '1',
+            'TERM': 'xterm-256color'
+        }
+
+        # Add API keys if available
+        if 'GEMINI_API_KEY' in os.environ:
+            exec_env['GEMINI_API_KEY'] = os.environ['GEMINI_API_KEY']
+            # VibeKit sets both
+            exec_env['GOOGLE_API_KEY'] = os.environ['GEMINI_API_KEY']
+
+        return exec_env
+
     async def _verify_gemini(self) -> None:
         """Verify gemini-cli is available (only once)"""
         if self._verified:
             return
 
+        async with self._verify_lock:
+            # Another tool call may have finished verifying while we waited
+            if not self._verified:
+                await self._probe_gemini()
+
+    async def _probe_gemini(self) -> None:
+        """Check the gemini binary, using the on-disk cache when it is fresh"""
+        # Keyed on the resolved binary and its mtime so an upgraded CLI is probed again
+        path = shutil.which("gemini")
+        if path is None:
+            # Nothing to spawn; fail without paying for a doomed exec
+            raise Exception(
+                "Gemini CLI not found or not working: 'gemini' is not on PATH"
+            )
+
         try:
+            # The binary can vanish between which() and here
+            cache_key = f"{path}:{os.stat(path).st_mtime_ns}"
+            version = _read_verify_cache(cache_key)
+            if version is not None:
+                logger.info(f"Gemini CLI available (cached): {version}")
+                self._verified = True
+                return
+
             process = await asyncio.create_subprocess_exec(
                 "gemini", "--version",
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE
             )
-            stdout, stderr = await process.communicate()
+            try:
+                stdout, stderr = await asyncio.wait_for(
+                    process.communicate(), timeout=10
+                )
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                raise Exception("version check timed out after 10 seconds")
+            except asyncio.CancelledError:
+                # Startup check abandoned as the server stops; don't leave it running
+                process.kill()
+                await process.wait()
+                raise
 
             if process.returncode != 0:
                 raise Exception(f"Gemini CLI not working: {stderr.decode()}")
-            logger.info(f"Gemini CLI available: {stdout.decode().strip()}")
+            version = stdout.decode().strip()
+            logger.info(f"Gemini CLI available: {version}")
+            _write_verify_cache(cache_key, version)
             self._verified = True
         except Exception as e:
             raise Exception(f"Gemini CLI not found or not working: {e}")
 
+    async def _warm_up(self) -> None:
+        """Verify gemini in the background while the client is still connecting"""
+        try:
+            await self._verify_gemini()
+        except Exception as e:
+            # Tool calls verify again on first use and report the error there
+            logger.warning("Gemini CLI check at startup failed: %s", e)
+
     def _setup_handlers(self) -> None:
         """Set up MCP handlers"""
 
         @self.server.list_tools()
         async def handle_list_tools() -> list[types.Tool]:
-            return [
-                types.Tool(
-                    name="gemini_ask",
-                    description="Ask Gemini a question (uses VibeKit's proven pattern)",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "prompt": {
-                                "type": "string",
-                                "description": "Question or prompt for Gemini"
-                            },
-                            "model": {
-                                "type": "string",
-                                "description": "Gemini model to use",
-                                "default": "gemini-2.5-flash"
-                            },
-                            "working_dir": {
-                                "type": "string",
-                                "description": "Working directory (for file context)",
-                                "default": "."
-                            },
-                            "files": {
-                                "type": "array",
-                                "items": {"type": "string"},
-                                "description": "Files to include using @ syntax",
-                                "default": []
-                            },
-                            "timeout": {
-                                "type": "integer",
-                                "description": "Timeout in seconds",
-                                "default": 60
-                            }
-                        },
-                        "required": ["prompt"]
-                    }
-                ),
-                types.Tool(
-                    name="gemini_code",
-                    description="Generate code changes using Gemini (VibeKit code mode)",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "prompt": {
-                                "type": "string",
-                                "description": "Code generation request"
-                            },
-                            "model": {
-                                "type": "string",
-                                "description": "Gemini model to use",
-                                "default": "gemini-2.5-pro"
-                            },
-                            "working_dir": {
-                                "type": "string",
-                                "description": "Working directory",
-                                "default": "."
-                            },
-                            "timeout": {
-                                "type": "integer",
-                                "description": "Timeout in seconds",
-                                "default": 120
-                            }
-                        },
-                        "required": ["prompt"]
-                    }
-                ),
-                types.Tool(
-                    name="gemini_with_files",
-                    description="Ask Gemini with specific files (uses @ syntax)",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "prompt": {
-                                "type": "string",
-                                "description": "The question or prompt"
-                            },
-                            "file_paths": {
-                                "type": "array",
-                                "items": {"type": "string"},
-                                "description": "List of file paths to include"
-                            },
-                            "model": {
-                                "type": "string",
-                                "description": "Gemini model to use",
-                                "default": "gemini-2.5-flash"
-                            },
-                            "working_dir": {
-                                "type": "string",
-                                "description": "Working directory",
-                                "default": "."
-                            },
-                            "timeout": {
-                                "type": "integer",
-                                "description": "Timeout in seconds",
-                                "default": 90
-                            }
-                        },
-                        "required": ["prompt", "file_paths"]
-                    }
-                )
-            ]
+            return _TOOLS
 
         @self.server.call_tool()
         async def handle_call_tool(name: str, arguments: dict[str, Any]) -> list[types.TextContent]:
@@ -168,20 +418,19 @@ class FixedGeminiMCPServer:
                 # Verify gemini on first use
                 await self._verify_gemini()
 
-                if name == "gemini_ask":
-                    result = await self._ask_gemini(arguments)
-                elif name == "gemini_code":
-                    result = await self._code_generation(arguments)
-                elif name == "gemini_with_files":
-                    result = await self._ask_with_files(arguments)
-                else:
+                handler = self._dispatch.get(name)
+                if handler is None:
                     result = f"Unknown tool: {name}"
+                else:
+                    result = await handler(arguments)
 
                 return [types.TextContent(type="text", text=result)]
 
             except Exception as e:
                 error_msg = f"Error executing {name}: {str(e)}"
-                logger.error(error_msg, exc_info=True)
+                logger.warning("Error executing %s: %s", name, e)
+                # Full tracebacks only when debugging; formatting one walks the frames
+                logger.debug("Traceback for %s", name, exc_info=True)
                 return [types.TextContent(type="text", text=error_msg)]
 
     async def _ask_gemini(self, arguments: dict[str, Any]) -> str:
@@ -192,21 +441,15 @@ class FixedGeminiMCPServer:
         files = arguments.get("files", [])
         timeout = arguments.get("timeout", 60)
 
-        # VibeKit's ask mode instruction
-        instruction = (
-            "Research the repository and answer the user's questions. "
-            "Do NOT make any changes to any files in the repository."
-        )
-
         # Build full prompt with files
         user_prompt = prompt
         if files:
             file_refs = " ".join(f"@{f}" for f in files)
             user_prompt = f"{file_refs} {prompt}"
 
-        full_prompt = f"{instruction}\n\nUser: {user_prompt}"
+        full_prompt = _ASK_PREFIX + user_prompt
 
-        return await self._execute_vibekit_pattern(full_prompt, model, working_dir, timeout)
+        return await self._execute_shared(full_prompt, model, working_dir, timeout)
 
     async def _code_generation(self, arguments: dict[str, Any]) -> str:
         """Generate code using VibeKit's code mode"""
@@ -215,13 +458,7 @@ class FixedGeminiMCPServer:
         working_dir = arguments.get("working_dir", ".")
         timeout = arguments.get("timeout", 120)
 
-        # VibeKit's code mode instruction
-        instruction = (
-            "Do the necessary changes to the codebase based on the users input.\n"
-            "Don't ask any follow up questions."
-        )
-
-        full_prompt = f"{instruction}\n\nUser: {prompt}"
+        full_prompt = _CODE_PREFIX + prompt
 
         return await self._execute_vibekit_pattern(full_prompt, model, working_dir, timeout)
 
@@ -239,87 +476,186 @@ class FixedGeminiMCPServer:
 
         return await self._execute_vibekit_pattern(full_prompt, model, working_dir, timeout)
 
-    async def _escape_prompt_python(self, prompt: str) -> str:
-        """Python version of VibeKit's prompt escaping"""
-        # Escape backticks, quotes, dollar signs, and backslashes
-        import re
-        return re.sub(r'[`"$\\]', r'\\\g<0>', prompt)
+    async def _run_batch(self, arguments: dict[str, Any]) -> str:
+        """Run several tool calls concurrently, reporting each result as JSON"""
+        calls = arguments["calls"]
+        # Reject malformed entries before anything runs
+        if not isinstance(calls, list):
+            raise Exception("calls must be an array of {name, arguments} objects")
+        for i, call in enumerate(calls):
+            if not isinstance(call, dict) or not isinstance(call.get("name"), str):
+                raise Exception(f"calls[{i}] must be an object with a string 'name'")
+            if not isinstance(call.get("arguments", {}), dict):
+                raise Exception(f"calls[{i}].arguments must be an object")
+        try:
+            max_concurrent = max(
+                1, int(arguments.get("max_concurrent", _MAX_CONCURRENT_CALLS))
+            )
+        except (TypeError, ValueError):
+            raise Exception("max_concurrent must be an integer")
+        stop_on_error = arguments.get("stop_on_error", False)
+        batch_sem = asyncio.Semaphore(max_concurrent)
+
+        async def run_call(call: dict[str, Any]) -> str:
+            name = call["name"]
+            if name == "gemini_batch":
+                raise Exception("gemini_batch cannot be nested")
+            handler = self._dispatch.get(name)
+            if handler is None:
+                raise Exception(f"Unknown tool: {name}")
+            call_arguments = call.get("arguments", {})
+            _check_required(name, call_arguments)
+            async with batch_sem:
+                return await handler(call_arguments)
+
+        tasks = [asyncio.ensure_future(run_call(call)) for call in calls]
+        outcomes: list[str | BaseException]
+        if stop_on_error:
+            try:
+                outcomes = await asyncio.gather(*tasks)
+            except Exception:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+        else:
+            outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+
+        results = []
+        for call, outcome in zip(calls, outcomes):
+            if isinstance(outcome, BaseException):
+                results.append({"name": call["name"], "error": str(outcome)})
+            else:
+                results.append({"name": call["name"], "result": outcome})
+        return json.dumps(results)
+
+    async def _execute_shared(
+        self, prompt: str, model: str, working_dir: str, timeout: int
+    ) -> str:
+        """Run an ask-mode prompt, joining an identical call already in flight"""
+        # The timeout is part of the key so nobody inherits a shorter deadline
+        key = (prompt, model, os.path.abspath(working_dir), timeout)
+        run = self._inflight.get(key)
+        if run is None:
+            run = _SharedRun(asyncio.ensure_future(
+                self._execute_vibekit_pattern(prompt, model, working_dir, timeout)
+            ))
+            self._inflight[key] = run
+        else:
+            logger.info("Joining in-flight gemini call in %s", working_dir)
+
+        # Shielded so one caller going away doesn't cancel the run for the others;
+        # the last caller out forgets the run, cancelling it if nobody got the answer
+        run.waiters += 1
+        try:
+            return await asyncio.shield(run.task)
+        finally:
+            run.waiters -= 1
+            if not run.waiters:
+                if self._inflight.get(key) is run:
+                    del self._inflight[key]
+                if not run.task.done():
+                    run.task.cancel()
 
     async def _execute_vibekit_pattern(self, prompt: str, model: str, working_dir: str, timeout: int) -> str:
         """Execute using VibeKit's exact pattern"""
         try:
-            logger.info(f"Executing VibeKit pattern in {working_dir}: {prompt[:50]}...")
-
-            # Escape prompt like VibeKit
-            escaped_prompt = self._escape_prompt_python(prompt)
-
-            # Build environment like VibeKit (set both keys)
-            exec_env = {
-                **os.environ,
-                'NODE_NO_WARNINGS': '1',
-                'TERM': 'xterm-256color'
-            }
-
-            # Add API keys if available
-            if 'GEMINI_API_KEY' in os.environ:
-                exec_env['GEMINI_API_KEY'] = os.environ['GEMINI_API_KEY']
-                exec_env['GOOGLE_API_KEY'] = os.environ['GEMINI_API_KEY']  # VibeKit sets both
+            logger.info(
+                "Executing VibeKit pattern in %s: %.50s...", working_dir, prompt
+            )
 
-            # Use VibeKit's exact command pattern
+            # Use VibeKit's exact command pattern. The prompt goes straight into
+            # argv (no shell involved), so it needs none of VibeKit's escaping.
             cmd_args = [
                 "gemini",
                 "--model", model,
-                "--prompt", escaped_prompt,
+                "--prompt", prompt,
                 "--yolo"  # VibeKit's auto-approval pattern
             ]
 
-            logger.info(f"VibeKit command: gemini --model {model} --prompt [escaped] --yolo")
-
-            # Execute like VibeKit
-            process = await asyncio.create_subprocess_exec(
-                *cmd_args,
-                cwd=working_dir,
-                env=exec_env,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
+            logger.info(
+                "VibeKit command: gemini --model %s --prompt [prompt] --yolo", model
             )
 
-            # Wait with timeout
+            # Execute like VibeKit. One deadline covers both queueing for a process
+            # slot and the run itself; _drain hands back trimmed, decoded text
             try:
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(),
-                    timeout=timeout
+                stdout_text, stderr_text, returncode = await asyncio.wait_for(
+                    self._run_gemini(cmd_args, working_dir), timeout=timeout
                 )
             except asyncio.TimeoutError:
-                process.kill()
-                await process.wait()
                 raise Exception(f"Command timed out after {timeout} seconds")
 
-            # Process output
-            stdout_text = stdout.decode('utf-8').strip()
-            stderr_text = stderr.decode('utf-8').strip()
-
-            if process.returncode != 0:
+            if returncode != 0:
                 if stderr_text:
-                    raise Exception(f"Gemini failed (code {process.returncode}): {stderr_text}")
+                    raise Exception(f"Gemini failed (code {returncode}): {stderr_text}")
                 else:
-                    raise Exception(f"Gemini failed with exit code {process.returncode}")
+                    raise Exception(f"Gemini failed with exit code {returncode}")
 
             result = stdout_text or "Command completed successfully"
 
             if not result:
                 return "No output from Gemini"
 
-            logger.info(f"VibeKit pattern success: {len(result)} characters")
+            logger.info("VibeKit pattern success: %d characters", len(result))
             return result
 
         except Exception as e:
-            logger.error(f"Error in VibeKit pattern: {e}")
+            logger.error("Error in VibeKit pattern: %s", e)
             raise
 
+    async def _run_gemini(
+        self, cmd_args: list[str], working_dir: str
+    ) -> tuple[str, str, int]:
+        """Run gemini in a free process slot, returning stdout, stderr and exit code"""
+        async with self._call_sem:
+            process = await asyncio.create_subprocess_exec(
+                *cmd_args,
+                cwd=working_dir,
+                env=self._base_env,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            self._processes.add(process)
+            try:
+                return await _communicate(process)
+            except asyncio.CancelledError:
+                # Timed out or abandoned; don't leave gemini running behind the call
+                process.kill()
+                await process.wait()
+                raise
+            finally:
+                self._processes.discard(process)
+
+    async def __aenter__(self) -> "FixedGeminiMCPServer":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.cleanup()
+
+    async def cleanup(self) -> None:
+        """Stop the startup check and kill gemini processes left by unfinished calls"""
+        if self._warmup is not None and not self._warmup.done():
+            self._warmup.cancel()
+            await asyncio.gather(self._warmup, return_exceptions=True)
+
+        processes = [p for p in self._processes if p.returncode is None]
+        for process in processes:
+            process.kill()
+        if processes:
+            logger.info("Killed %d running gemini process(es)", len(processes))
+            await asyncio.gather(*(p.wait() for p in processes), return_exceptions=True)
+        # Let shared runs whose processes were just killed finish failing
+        if self._inflight:
+            await asyncio.gather(
+                *(run.task for run in self._inflight.values()), return_exceptions=True
+            )
+
     async def run(self) -> None:
         """Run the MCP server"""
         logger.info("Starting Fixed Gemini MCP Server (VibeKit Pattern)")
+        # Overlap the CLI check with the MCP handshake so the first call skips it
+        self._warmup = asyncio.create_task(self._warm_up())
         async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
             await self.server.run(
                 read_stream,
@@ -335,16 +671,49 @@ class FixedGeminiMCPServer:
             )
 
 
+async def _serve_until_signal(server: FixedGeminiMCPServer) -> signal.Signals | None:
+    """Serve until stdin closes or SIGTERM/SIGINT arrives, returning the signal"""
+    loop = asyncio.get_running_loop()
+    stopped: asyncio.Future[signal.Signals] = loop.create_future()
+
+    def request_stop(sig: signal.Signals) -> None:
+        if not stopped.done():
+            stopped.set_result(sig)
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, request_stop, sig)
+
+    serving = asyncio.create_task(server.run())
+    racing: set[asyncio.Future[Any]] = {serving, stopped}
+    await asyncio.wait(racing, return_when=asyncio.FIRST_COMPLETED)
+    if serving.done():
+        stopped.cancel()
+        serving.result()  # Surface a server error
+        return None
+
+    # serving is left running: stdio_server reads stdin in a worker thread that
+    # cancellation can't interrupt, so it would only finish once stdin closes
+    logger.info("Shutdown signal received")
+    return stopped.result()
+
+
 async def main() -> None:
     """Main entry point"""
+    stop_signal = None
     try:
-        server = FixedGeminiMCPServer()
-        await server.run()
+        async with FixedGeminiMCPServer() as server:
+            stop_signal = await _serve_until_signal(server)
     except KeyboardInterrupt:
         logger.info("Server interrupted")
     except Exception as e:
         logger.error(f"Server error: {e}", exc_info=True)
         sys.exit(1)
+    finally:
+        if stop_signal is not None:
+            # cleanup() has run; exit the way the signal's default action would
+            # rather than waiting on the stdin reader
+            signal.signal(stop_signal, signal.SIG_DFL)
+            signal.raise_signal(stop_signal)
 
 
 if __name__ == "__main__":
@@ -21,10 +21,10 @@ async def debug_interactive_session():
     try:
         # Test /tools command
         print("\n1. Testing /tools command...")
-        start_time = asyncio.get_event_loop().time()
+        start_time = asyncio.get_running_loop().time()
 
         tools_response = await wrapper.list_tools()
-        end_time = asyncio.get_event_loop().time()
+        end_time = asyncio.get_running_loop().time()
 
         print(f"✓ /tools completed in {end_time - start_time:.2f} seconds")
         print(f"Tools response length: {len(tools_response)}")
@@ -32,10 +32,10 @@ async def debug_interactive_session():
 
         # Test /mcp command
         print("\n2. Testing /mcp command...")
-        start_time = asyncio.get_event_loop().time()
+        start_time = asyncio.get_running_loop().time()
 
         mcp_response = await wrapper.list_mcp_servers()
-        end_time = asyncio.get_event_loop().time()
+        end_time = asyncio.get_running_loop().time()
 
         print(f"✓ /mcp completed in {end_time - start_time:.2f} seconds")
         print(f"MCP response length: {len(mcp_response)}")
@@ -43,12 +43,12 @@ async def debug_interactive_session():
 
         # Test simple chat in session
         print("\n3. Testing simple chat in session...")
-        start_time = asyncio.get_event_loop().time()
+        start_time = asyncio.get_running_loop().time()
 
         session = await wrapper.start_interactive_session()
         try:
             response = await session.send_command("Hello, how are you?")
-            end_time = asyncio.get_event_loop().time()
+            end_time = asyncio.get_running_loop().time()
 
             print(f"✓ Chat completed in {end_time - start_time:.2f} seconds")
             print(f"Chat response length: {len(response)}")
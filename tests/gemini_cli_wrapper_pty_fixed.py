@@ -7,14 +7,15 @@ which allows proper terminal interaction for meta-commands like /tools, /mcp, et
 """
 
 import asyncio
-import fcntl
 import logging
 import os
 import pty
+import re
 import shlex
-import signal
+import shutil
 import subprocess
 import sys
+from typing import ClassVar
 
 # Configure logging to stderr for MCP servers
 logging.basicConfig(
@@ -24,10 +25,39 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+_READ_CHUNK_SIZE = 65536  # Max bytes pulled from the PTY per read
+_PROMPT_TAIL_BYTES = 1024  # Trailing output scanned for a returned prompt
+
+# Output cleaning patterns, compiled once at import
+# ANSI escape sequences plus block, progress bar and spinner characters,
+# deleted together in a single pass
+_NOISE_RE = re.compile(
+    r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])'
+    r'|[░▓█▏▎▍▌▋▊▉⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏]+'
+)
+_LOADING_DOTS_RE = re.compile(r'\s*\.\.\.\s*')
+_LOADING_MSG_RE = re.compile(r'\s*Loading.*?\n')
+_INIT_MSG_RE = re.compile(r'\s*Initializing.*?\n')
+_BLANK_LINES_RE = re.compile(r'\n\s*\n\s*\n+')
+_TRAILING_SPACE_RE = re.compile(r'[ \t]+\n')
+
+# Gemini CLI prompt indicators, matched in one case-insensitive scan
+_PROMPT_READY_RE = re.compile(
+    r'type your message'
+    r'|enter your prompt'
+    r'|what can i help'
+    r'|waiting for input'
+    r'|> ',  # Common prompt character
+    re.IGNORECASE
+)
+
 
 class GeminiCLIWrapper:
     """PTY-based wrapper for the actual gemini CLI binary"""
 
+    # Version strings keyed by resolved binary path, shared by all wrappers
+    _version_cache: ClassVar[dict[str, str]] = {}
+
     def __init__(self, gemini_command: str = "gemini"):
         """
         Args:
@@ -38,9 +68,16 @@ class GeminiCLIWrapper:
 
     def _verify_gemini_available(self) -> None:
         """Verify that gemini-cli is available and working"""
+        path = shutil.which(self.gemini_command)
+        if path is None:
+            raise Exception(f"Gemini CLI command '{self.gemini_command}' not found in PATH")
+
+        if path in self._version_cache:
+            return
+
         try:
             result = subprocess.run(
-                [self.gemini_command, "--version"],
+                [path, "--version"],
                 capture_output=True,
                 text=True,
                 timeout=10
@@ -49,6 +86,7 @@ class GeminiCLIWrapper:
                 raise Exception(f"Gemini CLI not working (exit code {result.returncode}): {result.stderr}")
 
             version_info = result.stdout.strip()
+            self._version_cache[path] = version_info
             logger.info(f"Gemini CLI available: {version_info}")
 
         except FileNotFoundError:
@@ -99,8 +137,7 @@ class GeminiCLIWrapper:
                 stdin=slave_fd,
                 stdout=slave_fd,
                 stderr=slave_fd,
-                env=os.environ.copy(),
-                preexec_fn=os.setsid  # Create a new process group
+                start_new_session=True  # Create a new process group
             )
 
             # Close the slave fd in the parent process
@@ -173,6 +210,10 @@ class GeminiInteractiveSession:
         self.master_fd = master_fd
         self.working_directory = working_directory
         self._ready = False
+        # Sessions are created inside the loop that drives their PTY
+        self._loop = asyncio.get_running_loop()
+        # Writes go through the event loop, so they must never block it
+        os.set_blocking(master_fd, False)
 
     async def wait_for_ready(self, timeout: float = 10.0) -> None:
         """Wait for the session to be ready for input"""
@@ -196,26 +237,17 @@ class GeminiInteractiveSession:
     async def _drain_initial_output(self) -> None:
         """Read and discard any initial output from Gemini CLI startup"""
         try:
-            # Set the master fd to non-blocking mode
-            flags = fcntl.fcntl(self.master_fd, fcntl.F_GETFL)
-            fcntl.fcntl(self.master_fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
-
-            # Read any available data for a short time
+            # Read whatever arrives within a short window of the previous output
             for _ in range(10):
                 try:
-                    data = os.read(self.master_fd, 1024)
-                    if data:
-                        chunk = data.decode('utf-8', errors='ignore')
-                        logger.debug(f"Initial output: {repr(chunk[:100])}")
-                    else:
-                        break
-                except OSError:
+                    data = await self._read_pty_when_ready(timeout=0.1)
+                except asyncio.TimeoutError:
                     # No more data available
                     break
-                await asyncio.sleep(0.1)
-
-            # Set back to blocking mode
-            fcntl.fcntl(self.master_fd, fcntl.F_SETFL, flags)
+                if not data:
+                    break
+                chunk = data.decode('utf-8', errors='ignore')
+                logger.debug(f"Initial output: {repr(chunk[:100])}")
 
         except Exception as e:
             logger.debug(f"Error draining initial output: {e}")
@@ -229,8 +261,7 @@ class GeminiInteractiveSession:
             logger.debug(f"Sending command to PTY: {command}")
 
             # Send the command
-            command_bytes = f"{command}\n".encode()
-            os.write(self.master_fd, command_bytes)
+            await self._write_pty(f"{command}\n".encode())
 
             # Wait for the response - focus on reading what comes AFTER the command
             response = await asyncio.wait_for(
@@ -250,9 +281,13 @@ class GeminiInteractiveSession:
 
     async def _read_incremental_response(self) -> str:
         """Read only the new output that appears after sending a command"""
-        buffer = ""
-        start_time = asyncio.get_event_loop().time()
+        buffer = bytearray()
+        has_content = False  # Any non-whitespace output yet
+        has_substantial_content = False  # More than 50 bytes of it
+        loop = self._loop
+        start_time = loop.time()
         last_data_time = start_time
+        deadline = start_time + 20.0  # Max time to wait
         consecutive_empty_reads = 0
 
         # Wait a moment for the command to start producing output
@@ -261,42 +296,41 @@ class GeminiInteractiveSession:
         logger.debug("Reading incremental response...")
 
         while True:
-            current_time = asyncio.get_event_loop().time()
+            current_time = loop.time()
             elapsed = current_time - start_time
             time_since_data = current_time - last_data_time
 
             # Stop conditions
-            if elapsed > 20.0:  # Max time to wait
+            if current_time > deadline:
                 logger.debug("Max wait time reached")
                 break
 
             # If we have content and no new data for a while, assume done
-            if len(buffer.strip()) > 50 and time_since_data > 2.0:
-                logger.debug(f"Have output ({len(buffer)} chars) and no data for {time_since_data:.1f}s")
+            if has_substantial_content and time_since_data > 2.0:
+                logger.debug(f"Have output ({len(buffer)} bytes) and no data for {time_since_data:.1f}s")
                 break
 
             # If no output at all after reasonable time, assume command had no output
-            if len(buffer.strip()) == 0 and elapsed > 5.0:
+            if not has_content and elapsed > 5.0:
                 logger.debug("No output after 5s, command may have no response")
                 break
 
             try:
                 # Try to read new data
-                loop = asyncio.get_event_loop()
-                data = await asyncio.wait_for(
-                    loop.run_in_executor(None, self._read_pty_nonblocking),
-                    timeout=1.0
-                )
+                data = await self._read_pty_when_ready(timeout=1.0)
 
                 if data:
                     consecutive_empty_reads = 0
                     last_data_time = current_time
-                    chunk = data.decode('utf-8', errors='ignore')
-                    buffer += chunk
-                    logger.debug(f"Read {len(chunk)} chars")
+                    buffer += data
+                    if not has_substantial_content:
+                        stripped = len(buffer.strip())
+                        has_content = stripped > 0
+                        has_substantial_content = stripped > 50
+                    logger.debug(f"Read {len(data)} bytes")
                 else:
                     consecutive_empty_reads += 1
-                    if consecutive_empty_reads > 5 and len(buffer.strip()) > 0:
+                    if consecutive_empty_reads > 5 and has_content:
                         logger.debug("Multiple empty reads with content, stopping")
                         break
 
@@ -307,97 +341,95 @@ class GeminiInteractiveSession:
                 logger.debug(f"Read error: {e}")
                 break
 
-        logger.debug(f"Incremental response complete: {len(buffer)} chars")
-        return self._clean_pty_output(buffer)
-
-
-    def _command_output_complete(self, buffer: str) -> bool:
-        """Check if command output appears complete"""
-        if not buffer:
-            return False
-
-        # Clean the buffer first
-        clean_buffer = self._clean_pty_output(buffer)
-
-        # For meta commands like /tools, /mcp, etc., look for specific completion patterns
-        # These commands typically show lists and then return to prompt
-        if len(clean_buffer.strip()) > 50:  # Reasonable amount of output
-            lines = clean_buffer.split('\n')
-            if len(lines) > 3:  # Multiple lines of output
-                # Check if we see a prompt or completion at the end
-                last_lines = ' '.join(lines[-2:]).lower()
-                if any(indicator in last_lines for indicator in [
-                    'type your message',
-                    'enter your prompt',
-                    'what can i help',
-                    'ctrl+',  # Control key hints
-                    '>'  # Prompt character
-                ]):
-                    return True
+        logger.debug(f"Incremental response complete: {len(buffer)} bytes")
+        # Decode once so characters split across reads survive
+        return self._clean_pty_output(buffer.decode('utf-8', errors='ignore'))
 
-        return False
-
-    def _looks_like_prompt_ready(self, buffer: str) -> bool:
+    def _looks_like_prompt_ready(self, buffer: bytes) -> bool:
         """Check if the buffer contains indicators that we're back at a ready prompt"""
         if not buffer:
             return False
 
-        # Look for common prompt indicators (without colors)
-        clean_buffer = self._clean_pty_output(buffer).lower()
+        # A returned prompt sits at the end, so only the tail needs scanning
+        tail = bytes(buffer[-_PROMPT_TAIL_BYTES:]).decode('utf-8', errors='ignore')
 
-        # Check for Gemini CLI prompt indicators
-        prompt_indicators = [
-            "type your message",
-            "enter your prompt",
-            "what can i help",
-            "waiting for input",
-            "> ",  # Common prompt character
-        ]
+        # Look for common prompt indicators (without colors)
+        clean_buffer = self._clean_pty_output(tail)
 
         # Also check if we see the command echo followed by output
-        lines = clean_buffer.split('\n')
-        if len(lines) > 5:  # If we have multiple lines, might be complete
-            last_few_lines = ' '.join(lines[-3:]).strip()
-            if any(indicator in last_few_lines for indicator in prompt_indicators):
+        # If we have multiple lines (or more output than the tail), might be complete
+        if clean_buffer.count('\n') > 4 or len(buffer) > _PROMPT_TAIL_BYTES:
+            last_few_lines = ' '.join(clean_buffer.rsplit('\n', 3)[-3:]).strip()
+            if _PROMPT_READY_RE.search(last_few_lines):
                 return True
 
         return False
 
     def _clean_pty_output(self, text: str) -> str:
         """Clean up PTY output by removing ANSI codes, loading bars, etc."""
-        import re
-
         # Remove ANSI escape sequences (colors, cursor movements, etc.)
-        ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-        text = ansi_escape.sub('', text)
+        # and progress bar/spinner characters; plain ASCII text has neither
+        if '\x1b' in text or not text.isascii():
+            text = _NOISE_RE.sub('', text)
 
         # Remove common loading/progress indicators
-        progress_patterns = [
-            r'░+',  # Block characters used in progress bars
-            r'▓+',  # Block characters
-            r'█+',  # Block characters
-            r'[▏▎▍▌▋▊▉█]+',  # Progress bar characters
-            r'[⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏]+',  # Spinner characters
-            r'\s*\.\.\.\s*',  # Loading dots
-            r'\s*Loading.*?\n',  # Loading messages
-            r'\s*Initializing.*?\n',  # Initialization messages
-        ]
-
-        for pattern in progress_patterns:
-            text = re.sub(pattern, '', text, flags=re.MULTILINE)
+        text = _LOADING_DOTS_RE.sub('', text)  # Loading dots
+        text = _LOADING_MSG_RE.sub('', text)  # Loading messages
+        text = _INIT_MSG_RE.sub('', text)  # Initialization messages
 
         # Clean up excessive whitespace
-        text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)  # Multiple empty lines
-        text = re.sub(r'[ \t]+\n', '\n', text)  # Trailing spaces
-        text = re.sub(r'\n+$', '', text)  # Trailing newlines
-        text = re.sub(r'^\n+', '', text)  # Leading newlines
+        text = _BLANK_LINES_RE.sub('\n\n', text)  # Multiple empty lines
+        text = _TRAILING_SPACE_RE.sub('\n', text)  # Trailing spaces
 
+        # strip() also takes care of leading and trailing newlines
         return text.strip()
 
+    async def _write_pty(self, data: bytes) -> None:
+        """Write all of data to the PTY, waiting for room when it is full"""
+        view = memoryview(data)
+        while view:
+            try:
+                written = os.write(self.master_fd, view)
+            except BlockingIOError:
+                await self._wait_pty_writable()
+                continue
+            view = view[written:]
+
+    async def _wait_pty_writable(self) -> None:
+        """Wait until the PTY master can accept more input"""
+        loop = self._loop
+        writable = loop.create_future()
+
+        def _on_writable() -> None:
+            if not writable.done():
+                writable.set_result(None)
+
+        loop.add_writer(self.master_fd, _on_writable)
+        try:
+            await writable
+        finally:
+            loop.remove_writer(self.master_fd)
+
+    async def _read_pty_when_ready(self, timeout: float) -> bytes:
+        """Wait for the event loop to report the PTY readable, then read from it"""
+        loop = self._loop
+        readable = loop.create_future()
+
+        def _on_readable() -> None:
+            if not readable.done():
+                readable.set_result(None)
+
+        loop.add_reader(self.master_fd, _on_readable)
+        try:
+            await asyncio.wait_for(readable, timeout)
+        finally:
+            loop.remove_reader(self.master_fd)
+        return self._read_pty_nonblocking()
+
     def _read_pty_nonblocking(self) -> bytes:
         """Non-blocking read from PTY"""
         try:
-            return os.read(self.master_fd, 1024)
+            return os.read(self.master_fd, _READ_CHUNK_SIZE)
         except OSError:
             return b""
 
@@ -465,12 +497,10 @@ class GeminiInteractiveSession:
                         command_bytes = f"{close_command}\n".encode()
                         os.write(self.master_fd, command_bytes)
 
-                        # Give it time to respond
-                        await asyncio.sleep(1.0)
-
-                        if self.process.returncode is not None:
-                            logger.debug(f"Session closed gracefully with '{close_command}'")
-                            return
+                        # Give it time to respond, returning as soon as it exits
+                        await asyncio.wait_for(self.process.wait(), timeout=1.0)
+                        logger.debug(f"Session closed gracefully with '{close_command}'")
+                        return
                     except Exception:
                         continue
 
@@ -478,11 +508,9 @@ class GeminiInteractiveSession:
                 logger.debug("Quit commands failed, sending Ctrl+C")
                 try:
                     os.write(self.master_fd, b'\x03')  # Ctrl+C
-                    await asyncio.sleep(1.0)
-
-                    if self.process.returncode is not None:
-                        logger.debug("Session closed with Ctrl+C")
-                        return
+                    await asyncio.wait_for(self.process.wait(), timeout=1.0)
+                    logger.debug("Session closed with Ctrl+C")
+                    return
                 except Exception:
                     pass
 
@@ -21,10 +21,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+_ANSI_RE = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
+
 def clean_ansi_codes(text: str) -> str:
     """Remove ANSI escape codes from text"""
-    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-    return ansi_escape.sub('', text)
+    return _ANSI_RE.sub('', text) if '\x1b' in text else text
 
 async def test_command_formats():
     """Test different ways to send commands to Gemini CLI"""
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Tests for the Fixed Gemini MCP Server against a fake gemini CLI on PATH
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import signal
+import stat
+import subprocess
+import sys
+import time
+
+import pytest
+
+pytest.importorskip("mcp")
+
+# Add the src directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import main  # noqa: E402
+
+# Stands in for `gemini --prompt ...`: answers with the prompt's last word,
+# fails on prompts ending in "fail" and takes a second over ones ending in "slow"
+FAKE_GEMINI = '''\
+import sys, time
+args = sys.argv[1:]
+if "--version" in args:
+    print("0.0.test")
+    sys.exit(0)
+prompt = args[args.index("--prompt") + 1]
+if prompt.endswith("fail"):
+    sys.stderr.write("boom\\n")
+    sys.exit(3)
+if prompt.endswith("slow"):
+    time.sleep(1)
+print("answer:", prompt.rsplit(" ", 1)[-1])
+'''
+
+
+@pytest.fixture
+def fake_gemini(tmp_path, monkeypatch):
+    """Put the fake CLI above first on PATH, with its own verification cache"""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    gemini = bin_dir / "gemini"
+    gemini.write_text(f"#!{sys.executable}\n{FAKE_GEMINI}")
+    gemini.chmod(gemini.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setattr(main, "_VERIFY_CACHE_FILE", str(tmp_path / "verified"))
+    return str(gemini)
+
+
+@pytest.fixture
+def server(fake_gemini):
+    """A server whose gemini is the fake CLI above"""
+    return main.FixedGeminiMCPServer()
+
+
+def fresh_import(name, **env):
+    """Read a module setting from a fresh import of main under extra env vars"""
+    return subprocess.run(
+        [sys.executable, "-c", f"import main; print(main.{name})"],
+        cwd=os.path.dirname(main.__file__),
+        env={**os.environ, **env},
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout.strip()
+
+
+def count_runs(server):
+    """Record every gemini run the server starts"""
+    runs = []
+    execute = server._execute_vibekit_pattern
+
+    async def counted(*args):
+        runs.append(args)
+        return await execute(*args)
+
+    server._execute_vibekit_pattern = counted
+    return runs
+
+
+def test_verified_cli_is_not_probed_again(server, monkeypatch):
+    asyncio.run(server._verify_gemini())
+
+    async def no_probe(*args, **kwargs):
+        raise AssertionError("gemini --version ran again")
+
+    monkeypatch.setattr(main.asyncio, "create_subprocess_exec", no_probe)
+    restarted = main.FixedGeminiMCPServer()
+    asyncio.run(restarted._verify_gemini())
+    assert restarted._verified
+
+    # A replaced binary no longer matches the cache key
+    gemini = shutil.which("gemini")
+    mtime_ns = os.stat(gemini).st_mtime_ns + 10**9
+    os.utime(gemini, ns=(mtime_ns, mtime_ns))
+    with pytest.raises(Exception, match="gemini --version ran again"):
+        asyncio.run(main.FixedGeminiMCPServer()._verify_gemini())
+
+
+def test_cache_entry_without_a_string_version_is_ignored(fake_gemini):
+    main._write_verify_cache("key", "0.0.test")
+    assert main._read_verify_cache("key") == "0.0.test"
+
+    with open(main._VERIFY_CACHE_FILE, "w", encoding="utf-8") as f:
+        json.dump({"key": "key", "version": 7, "verified_at": time.time()}, f)
+    assert main._read_verify_cache("key") is None
+
+
+def test_verify_cache_lives_under_xdg_cache_home(tmp_path):
+    path = fresh_import("_VERIFY_CACHE_FILE", XDG_CACHE_HOME=str(tmp_path))
+    assert path == str(tmp_path / "gemini-mcp" / "verified")
+
+
+def test_identical_asks_share_one_run(server, tmp_path):
+    runs = count_runs(server)
+
+    async def scenario():
+        return await asyncio.gather(*(
+            server._ask_gemini({"prompt": "q slow", "working_dir": str(tmp_path)})
+            for _ in range(3)
+        ))
+
+    assert asyncio.run(scenario()) == ["answer: slow"] * 3
+    assert len(runs) == 1
+    assert server._inflight == {}
+
+
+def test_calls_with_files_are_not_shared(server, tmp_path):
+    runs = count_runs(server)
+    arguments = {
+        "prompt": "q slow", "file_paths": ["a.py"], "working_dir": str(tmp_path)
+    }
+
+    async def scenario():
+        return await asyncio.gather(
+            server._ask_with_files(arguments), server._ask_with_files(arguments)
+        )
+
+    assert asyncio.run(scenario()) == ["answer: slow"] * 2
+    assert len(runs) == 2
+
+
+def test_shared_run_survives_a_cancelled_joiner(server, tmp_path):
+    runs = count_runs(server)
+
+    def ask():
+        return server._execute_shared("q slow", "m", str(tmp_path), 30)
+
+    async def scenario():
+        # A finished burst on the same key must leave nothing behind for the next one
+        assert await asyncio.gather(ask(), ask()) == ["answer: slow"] * 2
+        assert server._inflight == {}
+
+        first = asyncio.ensure_future(ask())
+        second = asyncio.ensure_future(ask())
+        await asyncio.sleep(0.3)
+        assert len(server._inflight) == 1
+
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "answer: slow"
+    assert len(runs) == 2
+    assert server._inflight == {}
+
+
+def test_shared_runs_are_keyed_on_timeout(server, tmp_path):
+    async def scenario():
+        calls = [
+            asyncio.ensure_future(
+                server._execute_shared("q slow", "m", str(tmp_path), timeout)
+            )
+            for timeout in (30, 60)
+        ]
+        await asyncio.sleep(0.3)
+        assert len(server._inflight) == 2
+        return await asyncio.gather(*calls)
+
+    assert asyncio.run(scenario()) == ["answer: slow"] * 2
+    assert server._inflight == {}
+
+
+def test_gemini_processes_are_capped(server, monkeypatch, tmp_path):
+    server._call_sem = asyncio.Semaphore(2)
+    spawned = []
+    peak = 0
+    real_exec = asyncio.create_subprocess_exec
+
+    async def spawn(*args, **kwargs):
+        nonlocal peak
+        process = await real_exec(*args, **kwargs)
+        spawned.append(process)
+        peak = max(peak, sum(p.returncode is None for p in spawned))
+        return process
+
+    async def scenario():
+        monkeypatch.setattr(main.asyncio, "create_subprocess_exec", spawn)
+        return await asyncio.gather(*(
+            server._execute_vibekit_pattern(f"q{i} slow", "m", str(tmp_path), 30)
+            for i in range(4)
+        ))
+
+    assert asyncio.run(scenario()) == ["answer: slow"] * 4
+    assert len(spawned) == 4
+    assert peak == 2
+
+
+def test_shared_run_is_cancelled_with_its_last_caller(server, tmp_path):
+    async def scenario():
+        call = asyncio.ensure_future(
+            server._execute_shared("q slow", "m", str(tmp_path), 30)
+        )
+        await asyncio.sleep(0.3)
+        (process,) = server._processes
+        call.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await call
+        await asyncio.wait_for(process.wait(), 5)
+        return process
+
+    process = asyncio.run(scenario())
+    assert process.returncode is not None and process.returncode < 0
+    assert server._inflight == {}
+    assert server._processes == set()
+
+
+def test_cleanup_kills_running_calls(server, tmp_path):
+    async def scenario():
+        call = asyncio.ensure_future(
+            server._code_generation({"prompt": "q slow", "working_dir": str(tmp_path)})
+        )
+        await asyncio.sleep(0.3)
+        (process,) = server._processes
+        async with server:
+            pass
+        assert process.returncode is not None and process.returncode < 0
+        with pytest.raises(Exception, match="Gemini failed"):
+            await call
+
+    asyncio.run(scenario())
+    assert server._processes == set()
+
+
+def test_sigterm_stops_a_serving_process(fake_gemini):
+    process = subprocess.Popen(
+        [sys.executable, main.__file__],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        # Once it has answered initialize, the server is blocked reading stdin
+        process.stdin.write(json.dumps({
+            "jsonrpc": "2.0", "id": 1, "method": "initialize",
+            "params": {
+                "protocolVersion": "2025-06-18",
+                "capabilities": {},
+                "clientInfo": {"name": "test", "version": "0"}
+            }
+        }).encode() + b"\n")
+        process.stdin.flush()
+        assert json.loads(process.stdout.readline())["id"] == 1
+
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=5) == -signal.SIGTERM
+    finally:
+        process.kill()
+        process.wait()
+
+
+def test_batch_reports_each_call(server):
+    result = asyncio.run(server._run_batch({"calls": [
+        {"name": "gemini_ask", "arguments": {"prompt": "one"}},
+        {"name": "gemini_code", "arguments": {"prompt": "two"}},
+        {"name": "gemini_ask", "arguments": {"prompt": "x fail"}},
+        {"name": "gemini_ask", "arguments": {}},
+        {"name": "gemini_batch", "arguments": {"calls": []}},
+    ]}))
+
+    assert json.loads(result) == [
+        {"name": "gemini_ask", "result": "answer: one"},
+        {"name": "gemini_code", "result": "answer: two"},
+        {"name": "gemini_ask", "error": "Gemini failed (code 3): boom"},
+        {
+            "name": "gemini_ask",
+            "error": "Missing required argument(s) for gemini_ask: prompt"
+        },
+        {"name": "gemini_batch", "error": "gemini_batch cannot be nested"},
+    ]
+
+
+def test_batch_stop_on_error_cancels_the_rest(server):
+    async def scenario():
+        with pytest.raises(Exception, match="boom"):
+            await server._run_batch({"stop_on_error": True, "calls": [
+                {"name": "gemini_ask", "arguments": {"prompt": "q slow"}},
+                {"name": "gemini_ask", "arguments": {"prompt": "x fail"}},
+            ]})
+
+    asyncio.run(scenario())
+    # The slow call's gemini process went down with the batch
+    assert server._processes == set()
+    assert server._inflight == {}
+
+
+@pytest.mark.parametrize("arguments, message", [
+    ({"calls": "gemini_ask"}, "calls must be an array"),
+    (
+        {"calls": [{"name": "gemini_ask", "arguments": {"prompt": "a"}}, "oops"]},
+        r"calls\[1\]"
+    ),
+    ({"calls": [{"name": "gemini_ask", "arguments": "a"}]}, r"calls\[0\]\.arguments"),
+    ({"calls": [], "max_concurrent": "lots"}, "max_concurrent must be an integer"),
+])
+def test_batch_rejects_malformed_input(server, arguments, message):
+    with pytest.raises(Exception, match=message):
+        asyncio.run(server._run_batch(arguments))
+    assert server._processes == set()
+
+
+def test_cancelled_startup_check_kills_the_probe(server, monkeypatch):
+    spawned = []
+    real_exec = asyncio.create_subprocess_exec
+
+    async def hanging_probe(*args, **kwargs):
+        # A `gemini --version` that never answers
+        process = await real_exec(
+            sys.executable, "-c", "import time; time.sleep(30)", **kwargs
+        )
+        spawned.append(process)
+        return process
+
+    async def scenario():
+        monkeypatch.setattr(main.asyncio, "create_subprocess_exec", hanging_probe)
+        server._warmup = asyncio.ensure_future(server._warm_up())
+        await asyncio.sleep(0.3)
+        await server.cleanup()
+
+    asyncio.run(scenario())
+    (process,) = spawned
+    assert process.returncode is not None and process.returncode < 0
+    assert not server._verified
+
+
+def test_probe_reports_a_binary_that_vanished(server, monkeypatch, tmp_path):
+    # which() finds a path that is gone by the time it is stat'ed
+    gone = str(tmp_path / "gone" / "gemini")
+    monkeypatch.setattr(main.shutil, "which", lambda name: gone)
+    with pytest.raises(Exception, match="Gemini CLI not found or not working"):
+        asyncio.run(server._verify_gemini())
+
+
+def test_queueing_for_a_process_slot_counts_against_the_timeout(server, tmp_path):
+    server._call_sem = asyncio.Semaphore(1)
+
+    async def scenario():
+        busy = asyncio.ensure_future(
+            server._execute_vibekit_pattern("q slow", "m", str(tmp_path), 30)
+        )
+        await asyncio.sleep(0.3)
+        started = time.monotonic()
+        with pytest.raises(Exception, match="Command timed out after 0.2 seconds"):
+            await server._execute_vibekit_pattern("p slow", "m", str(tmp_path), 0.2)
+        assert time.monotonic() - started < 0.6
+        assert len(server._processes) == 1
+        return await busy
+
+    assert asyncio.run(scenario()) == "answer: slow"
+
+
+@pytest.mark.parametrize("setting, cap", [("2", "2"), ("lots", "4"), ("0", "1")])
+def test_process_cap_comes_from_the_environment(setting, cap):
+    env = {"GEMINI_MCP_MAX_CONCURRENT": setting}
+    assert fresh_import("_MAX_CONCURRENT_CALLS", **env) == cap
@@ -29,15 +29,15 @@ async def test_meta_commands():
         print("✓ Wrapper initialized successfully")
 
         print("\n=== Testing /tools command ===")
-        start_time = asyncio.get_event_loop().time()
+        start_time = asyncio.get_running_loop().time()
         tools_response = await wrapper.list_tools()
-        elapsed = asyncio.get_event_loop().time() - start_time
+        elapsed = asyncio.get_running_loop().time() - start_time
         print(f"Tools response (took {elapsed:.2f}s): {tools_response[:200]}...")
 
         print("\n=== Testing /mcp command ===")
-        start_time = asyncio.get_event_loop().time()
+        start_time = asyncio.get_running_loop().time()
         mcp_response = await wrapper.list_mcp_servers()
-        elapsed = asyncio.get_event_loop().time() - start_time
+        elapsed = asyncio.get_running_loop().time() - start_time
         print(f"MCP response (took {elapsed:.2f}s): {mcp_response[:200]}...")
 
         print("\n=== Testing interactive session directly ===")
@@ -45,16 +45,16 @@ async def test_meta_commands():
 
         # Test /help command
         print("Testing /help command...")
-        start_time = asyncio.get_event_loop().time()
+        start_time = asyncio.get_running_loop().time()
         help_response = await session.send_command("/help")
-        elapsed = asyncio.get_event_loop().time() - start_time
+        elapsed = asyncio.get_running_loop().time() - start_time
         print(f"Help response (took {elapsed:.2f}s): {help_response[:200]}...")
 
         # Test /stats command
         print("Testing /stats command...")
-        start_time = asyncio.get_event_loop().time()
+        start_time = asyncio.get_running_loop().time()
         stats_response = await session.send_command("/stats")
-        elapsed = asyncio.get_event_loop().time() - start_time
+        elapsed = asyncio.get_running_loop().time() - start_time
         print(f"Stats response (took {elapsed:.2f}s): {stats_response[:200]}...")
 
         await session.close()
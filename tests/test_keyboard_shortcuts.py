@@ -34,7 +34,7 @@ async def test_keyboard_shortcuts():
 
         # Test Ctrl+T for MCP servers (based on the "ctrl+t to view" message)
         print("\n=== Testing Ctrl+T for MCP servers ===")
-        start_time = asyncio.get_event_loop().time()
+        start_time = asyncio.get_running_loop().time()
         try:
             # Send Ctrl+T (ASCII 20)
             os.write(session.master_fd, b'\x14')  # Ctrl+T
@@ -42,12 +42,12 @@ async def test_keyboard_shortcuts():
 
             # Try to read the response using the send_command method (which handles reading)
             response = await session._read_incremental_response()
-            elapsed = asyncio.get_event_loop().time() - start_time
+            elapsed = asyncio.get_running_loop().time() - start_time
             print(f"✓ Ctrl+T completed in {elapsed:.2f}s")
             print(f"Response: {response[:300]}...")
 
         except Exception as e:
-            elapsed = asyncio.get_event_loop().time() - start_time
+            elapsed = asyncio.get_running_loop().time() - start_time
             print(f"✗ Ctrl+T failed after {elapsed:.2f}s: {e}")
 
         # Test some other potential shortcuts
@@ -59,13 +59,13 @@ async def test_keyboard_shortcuts():
 
         for shortcut, description in shortcuts_to_test:
             print(f"\n=== Testing {description} ===")
-            start_time = asyncio.get_event_loop().time()
+            start_time = asyncio.get_running_loop().time()
             try:
                 os.write(session.master_fd, shortcut)
                 await asyncio.sleep(1.0)
 
                 response = await session._read_incremental_response()
-                elapsed = asyncio.get_event_loop().time() - start_time
+                elapsed = asyncio.get_running_loop().time() - start_time
                 print(f"✓ {description} completed in {elapsed:.2f}s")
                 if response.strip():
                     print(f"Response: {response[:200]}...")
@@ -73,17 +73,17 @@ async def test_keyboard_shortcuts():
                     print("No response")
 
             except Exception as e:
-                elapsed = asyncio.get_event_loop().time() - start_time
+                elapsed = asyncio.get_running_loop().time() - start_time
                 print(f"✗ {description} failed after {elapsed:.2f}s: {e}")
 
         # Now test if slash commands work after getting into the right state
         print("\n=== Testing slash commands again ===")
         for command in ["/tools", "/mcp", "/help"]:
             print(f"Testing {command}...")
-            start_time = asyncio.get_event_loop().time()
+            start_time = asyncio.get_running_loop().time()
             try:
                 response = await session.send_command(command, timeout=10.0)
-                elapsed = asyncio.get_event_loop().time() - start_time
+                elapsed = asyncio.get_running_loop().time() - start_time
                 print(f"✓ {command} completed in {elapsed:.2f}s")
                 if response.strip() and "Tips for getting started" not in response:
                     print(f"Good response: {response[:200]}...")
@@ -91,7 +91,7 @@ async def test_keyboard_shortcuts():
                     print("Still getting generic response")
 
             except Exception as e:
-                elapsed = asyncio.get_event_loop().time() - start_time
+                elapsed = asyncio.get_running_loop().time() - start_time
                 print(f"✗ {command} failed after {elapsed:.2f}s: {e}")
 
         await session.close()
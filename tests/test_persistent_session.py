@@ -61,7 +61,7 @@ if __name__ == "__main__":
     asyncio.run(test_persistent_session())
             try:
                 response = await session.send_command(command, timeout=15.0)
-                elapsed = asyncio.get_event_loop().time() - start_time
+                elapsed = asyncio.get_running_loop().time() - start_time
                 print(f"✓ Command '{command}' completed in {elapsed:.2f}s")
 
                 # Show a preview of the response
@@ -73,14 +73,14 @@ if __name__ == "__main__":
                     print("Response was empty")
 
             except Exception as e:
-                elapsed = asyncio.get_event_loop().time() - start_time
+                elapsed = asyncio.get_running_loop().time() - start_time
                 print(f"✗ Command '{command}' failed after {elapsed:.2f}s: {e}")
 
         print(f"\n=== Testing a simple prompt ===")
-        start_time = asyncio.get_event_loop().time()
+        start_time = asyncio.get_running_loop().time()
         try:
             response = await session.send_command("What is 2+2?", timeout=15.0)
-            elapsed = asyncio.get_event_loop().time() - start_time
+            elapsed = asyncio.get_running_loop().time() - start_time
             print(f"✓ Simple prompt completed in {elapsed:.2f}s")
 
             clean_response = response.strip()
@@ -91,7 +91,7 @@ if __name__ == "__main__":
                 print("Response was empty")
 
         except Exception as e:
-            elapsed = asyncio.get_event_loop().time() - start_time
+            elapsed = asyncio.get_running_loop().time() - start_time
             print(f"✗ Simple prompt failed after {elapsed:.2f}s: {e}")
 
         print(f"\n=== Closing session ===")
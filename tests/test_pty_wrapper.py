@@ -29,16 +29,16 @@ async def test_pty_wrapper():
         print("✓ PTY Wrapper initialized successfully")
 
         print("\n=== Testing /tools command ===")
-        start_time = asyncio.get_event_loop().time()
+        start_time = asyncio.get_running_loop().time()
         tools_response = await wrapper.list_tools()
-        elapsed = asyncio.get_event_loop().time() - start_time
+        elapsed = asyncio.get_running_loop().time() - start_time
         print(f"Tools response (took {elapsed:.2f}s):")
         print(tools_response[:500] + "..." if len(tools_response) > 500 else tools_response)
 
         print("\n=== Testing /mcp command ===")
-        start_time = asyncio.get_event_loop().time()
+        start_time = asyncio.get_running_loop().time()
         mcp_response = await wrapper.list_mcp_servers()
-        elapsed = asyncio.get_event_loop().time() - start_time
+        elapsed = asyncio.get_running_loop().time() - start_time
         print(f"MCP response (took {elapsed:.2f}s):")
         print(mcp_response[:500] + "..." if len(mcp_response) > 500 else mcp_response)
 
@@ -47,9 +47,9 @@ async def test_pty_wrapper():
 
         # Test /help command
         print("Testing /help command...")
-        start_time = asyncio.get_event_loop().time()
+        start_time = asyncio.get_running_loop().time()
         help_response = await session.send_command("/help")
-        elapsed = asyncio.get_event_loop().time() - start_time
+        elapsed = asyncio.get_running_loop().time() - start_time
         print(f"Help response (took {elapsed:.2f}s):")
         print(help_response[:500] + "..." if len(help_response) > 500 else help_response)
 